@@ -7,6 +7,16 @@ from datetime import datetime, timedelta
 import os
 import json
 import uuid
+import hashlib
+import io
+import imghdr
+import logging
+import threading
+import time
+from PIL import Image
+from change_feed import append_change
+
+logger = logging.getLogger(__name__)
 
 # Set page configuration
 st.set_page_config(
@@ -99,37 +109,264 @@ if 'menu_categories' not in st.session_state:
 if 'expenses' not in st.session_state:
     st.session_state.expenses = []
 
+# Inventory: ingredients, recipes (menu item id -> ingredient quantities) and the stock ledger
+if 'ingredients' not in st.session_state:
+    st.session_state.ingredients = []
+
+if 'recipes' not in st.session_state:
+    st.session_state.recipes = {}
+
+if 'inventory_ledger' not in st.session_state:
+    st.session_state.inventory_ledger = []
+
+# Sequence number of the last change recorded in the change feed
+if 'last_seq' not in st.session_state:
+    st.session_state.last_seq = 0
+
+# Version of the shop data this session last loaded or saved, used to key cached reports
+if 'data_version' not in st.session_state:
+    st.session_state.data_version = "0:0"
+
 # Initialize order_completed flag
 if 'order_completed' not in st.session_state:
     st.session_state.order_completed = False
 
+# Cart for quick order entry (item id -> quantity)
+if 'cart' not in st.session_state:
+    st.session_state.cart = {}
+
+# Menu version is bumped whenever the menu changes so derived lookups can be rebuilt
+if 'menu_version' not in st.session_state:
+    st.session_state.menu_version = 0
+
+# Menus larger than this default to quick order entry
+LARGE_MENU_THRESHOLD = 30
+ORDER_MODES = ["Standard", "Quick"]
+
+# Menu item photos are stored once by content hash; thumbnails live in a size-bounded disk cache
+IMAGE_DIR = os.path.join('data', 'images')
+THUMBNAIL_DIR = os.path.join('data', 'thumbnails')
+THUMBNAIL_SIZE = (160, 160)
+THUMBNAIL_CACHE_MAX_BYTES = 20 * 1024 * 1024
+THUMBNAIL_TOUCH_INTERVAL = 60 * 60
+ALLOWED_IMAGE_TYPES = ["png", "jpeg", "gif", "bmp", "webp"]
+
+# Exported report CSVs are cached on disk by report type, date range and data version
+REPORT_CACHE_DIR = os.path.join('data', 'reports')
+REPORT_CHUNK_DIR = os.path.join(REPORT_CACHE_DIR, 'days')
+REPORT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+REPORT_TOUCH_INTERVAL = 60 * 60
+
+# Stock ledger entries are recorded in the change feed in batches so a backfill never writes one huge line
+INVENTORY_FEED_BATCH_SIZE = 500
+
+# Derived state (date index, rollups, stock levels) is persisted next to the data, keyed by data version.
+# It is stored as plain arrays and JSON and loaded without pickle, so the file can never run code.
+DERIVED_STATE_FILE = 'shop_data.derived.npz'
+
+# Function to get the data store shared by all sessions of this server process
+@st.cache_resource
+def get_data_store():
+    return {"lock": threading.Lock(), "mtime": None, "version": None, "data": None, "derived": None, "persisted_version": None, "warming": False, "failed_version": None}
+
+# Function to write a data or cache file, so another session never reads a partially written file
+def write_cached_file(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# Function to get the version of a dataset from its saved content, used to key derived state and reports
+def get_data_version(data, content):
+    return f"{data.get('last_seq', 0)}:{len(content)}:{hashlib.sha256(content).hexdigest()[:16]}"
+
+# Function to load persisted derived state if it matches the data version
+def load_derived_state(version, data):
+    try:
+        with np.load(DERIVED_STATE_FILE, allow_pickle=False) as persisted:
+            if str(persisted["version"]) != version:
+                return None
+            kpi_series = {
+                key: pd.DataFrame(persisted[f"{key}_values"],
+                                  index=pd.DatetimeIndex(persisted[f"{key}_index"], name="Date"),
+                                  columns=pd.Index(persisted[f"{key}_columns"].tolist(), name="Item", dtype=object))
+                for key in ("quantity", "revenue")
+            }
+            kpi_series["orders"] = pd.Series(persisted["orders_values"], index=pd.DatetimeIndex(persisted["orders_index"], name="Date"), name="Order")
+            return {
+                "order_dates": persisted["order_dates"],
+                "kpi_series": kpi_series,
+                # The menu index points at the item dicts themselves, so it is rebuilt rather than stored
+                "menu_index": build_menu_index(data.get("menu_items", []), data["menu_categories"]),
+                "stock_levels": json.loads(str(persisted["stock_levels"]))
+            }
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable derived state in %s", DERIVED_STATE_FILE, exc_info=True)
+        return None
+
+# Function to persist derived state next to the data
+def save_derived_state(version, derived):
+    arrays = {
+        "version": np.array(version),
+        "order_dates": derived["order_dates"],
+        "orders_values": derived["kpi_series"]["orders"].to_numpy(dtype=float),
+        "orders_index": derived["kpi_series"]["orders"].index.to_numpy(dtype="datetime64[ns]"),
+        "stock_levels": np.array(json.dumps(derived["stock_levels"]))
+    }
+    for key in ("quantity", "revenue"):
+        frame = derived["kpi_series"][key]
+        arrays[f"{key}_values"] = frame.to_numpy(dtype=float)
+        arrays[f"{key}_index"] = frame.index.to_numpy(dtype="datetime64[ns]")
+        arrays[f"{key}_columns"] = np.array([str(column) for column in frame.columns], dtype=str)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    write_cached_file(DERIVED_STATE_FILE, buffer.getvalue())
+
+# Function to build all derived state for a dataset
+def build_derived_state(data):
+    return {
+        "order_dates": build_order_date_index(data["orders"]),
+        "kpi_series": build_daily_item_series(data["orders"]),
+        "menu_index": build_menu_index(data.get("menu_items", []), data["menu_categories"]),
+        "stock_levels": build_stock_levels(data["ingredients"], data["inventory_ledger"])
+    }
+
+# Function to build missing derived state and persist it, run in a background thread once per process
+def warm_up_data_store(store):
+    version = None
+    try:
+        while True:
+            with store["lock"]:
+                version, data, derived = store["version"], store["data"], store["derived"]
+                if derived is not None and store["persisted_version"] == version:
+                    store["warming"] = False
+                    return
+            if derived is None:
+                derived = build_derived_state(data)
+            save_derived_state(version, derived)
+            with store["lock"]:
+                store["persisted_version"] = version
+                # The data may have changed while building; the loop then warms up the newer version
+                if store["version"] == version and store["derived"] is None:
+                    store["derived"] = derived
+    except Exception:
+        logger.exception("Building derived state for data version %s failed", version)
+        with store["lock"]:
+            store["warming"] = False
+            # Sessions build what they need themselves; the warm-up waits for the next data version
+            store["failed_version"] = version
+
+# Function to start the background warm-up unless it is already running or already failed for this data version (call with the store lock held)
+def start_warm_up(store):
+    if not store["warming"] and store["version"] != store["failed_version"]:
+        store["warming"] = True
+        threading.Thread(target=warm_up_data_store, args=(store,), daemon=True).start()
+
+# Function to get the parsed data and derived state for a file version, loading the file once per process
+def get_data_snapshot(mtime):
+    store = get_data_store()
+    with store["lock"]:
+        if store["mtime"] != mtime:
+            with open('shop_data.json', 'rb') as f:
+                content = f.read()
+            data = json.loads(content)
+            for key in ("orders", "expenses", "ingredients", "inventory_ledger"):
+                data.setdefault(key, [])
+            data.setdefault("menu_categories", ["Fast Food", "Snacks", "Beverages", "Desserts", "Others"])
+            data.setdefault("recipes", {})
+            version = get_data_version(data, content)
+            derived = load_derived_state(version, data)
+            store.update(mtime=mtime, version=version, data=data, derived=derived,
+                         persisted_version=version if derived is not None else None)
+        if store["derived"] is None or store["persisted_version"] != store["version"]:
+            start_warm_up(store)
+        return store["data"], store["derived"], store["version"]
+
+# Function to share a session's freshly saved data and derived state with the other sessions
+def publish_data_snapshot(mtime, version, data):
+    derived = None
+    if all(st.session_state.get(key) is not None for key in ("order_dates", "kpi_series", "stock_levels")):
+        derived = {
+            "order_dates": st.session_state.order_dates,
+            "kpi_series": {key: frame.copy() for key, frame in st.session_state.kpi_series.items()},
+            "menu_index": get_menu_index(),
+            "stock_levels": dict(st.session_state.stock_levels)
+        }
+    store = get_data_store()
+    with store["lock"]:
+        # Lists are copied so later appends in this session do not leak into the shared snapshot
+        store.update(mtime=mtime, version=version, derived=derived,
+                     data={key: list(value) if isinstance(value, list) else (dict(value) if isinstance(value, dict) else value)
+                           for key, value in data.items()})
+        start_warm_up(store)
+
 # Function to save data
 def save_data():
     data = {
         "orders": st.session_state.orders,
         "menu_items": st.session_state.menu_items,
         "expenses": st.session_state.expenses,
-        "menu_categories": st.session_state.menu_categories
+        "menu_categories": st.session_state.menu_categories,
+        "ingredients": st.session_state.ingredients,
+        "recipes": st.session_state.recipes,
+        "inventory_ledger": st.session_state.inventory_ledger,
+        "last_seq": st.session_state.last_seq
     }
     os.makedirs('data', exist_ok=True)
-    with open('shop_data.json', 'w') as f:
-        json.dump(data, f)
+    content = json.dumps(data).encode()
+    write_cached_file('shop_data.json', content)
+    # Our own write is already reflected in session state, so skip reloading it
+    stat = os.stat('shop_data.json')
+    st.session_state.data_mtime = stat.st_mtime_ns
+    st.session_state.data_version = get_data_version(data, content)
+    publish_data_snapshot(stat.st_mtime_ns, st.session_state.data_version, data)
 
 # Function to load data
 def load_data():
     try:
         if os.path.exists('shop_data.json'):
-            with open('shop_data.json', 'r') as f:
-                data = json.load(f)
-                st.session_state.orders = data.get("orders", [])
-                st.session_state.menu_items = data.get("menu_items", st.session_state.menu_items)
-                st.session_state.expenses = data.get("expenses", [])
-                st.session_state.menu_categories = data.get("menu_categories", ["Fast Food", "Snacks", "Beverages", "Desserts", "Others"])
+            # Only pick up the file when it changed since this session last saw it
+            stat = os.stat('shop_data.json')
+            if st.session_state.get('data_mtime') == stat.st_mtime_ns:
+                return
+            data, derived, version = get_data_snapshot(stat.st_mtime_ns)
+            # The parsed data is shared by the process; each session works on its own lists
+            st.session_state.orders = list(data["orders"])
+            if "menu_items" in data:
+                st.session_state.menu_items = list(data["menu_items"])
+            st.session_state.expenses = list(data["expenses"])
+            st.session_state.menu_categories = list(data["menu_categories"])
+            st.session_state.ingredients = list(data["ingredients"])
+            st.session_state.recipes = dict(data["recipes"])
+            st.session_state.inventory_ledger = list(data["inventory_ledger"])
+            st.session_state.last_seq = data.get("last_seq", 0)
+            st.session_state.data_mtime = stat.st_mtime_ns
+            st.session_state.data_version = version
+            st.session_state.menu_version += 1
+            st.session_state.recipe_matrix = None
+            st.session_state.order_ledger_entries = None
+            if derived is not None:
+                # Reuse the warm derived state instead of re-parsing dates and re-aggregating
+                st.session_state.order_dates = derived["order_dates"]
+                st.session_state.kpi_series = {key: frame.copy() for key, frame in derived["kpi_series"].items()}
+                if "menu_items" in data:
+                    st.session_state.menu_index = derived["menu_index"]
+                    st.session_state.menu_index_version = st.session_state.menu_version
+                st.session_state.stock_levels = dict(derived["stock_levels"])
+            else:
+                st.session_state.order_dates = None
+                st.session_state.kpi_series = None
+                st.session_state.stock_levels = None
     except Exception as e:
         st.error(f"Error loading data: {e}")
 
-# Load data at startup
-load_data()
+# Function to record a mutation in the change feed so replicas can sync incrementally
+def record_change(op, payload):
+    change = append_change(op, payload)
+    st.session_state.last_seq = change["seq"]
 
 # Function to add a new order
 def add_order(items, total_amount):
@@ -140,6 +377,11 @@ def add_order(items, total_amount):
         "total": total_amount
     }
     st.session_state.orders.append(order)
+    if st.session_state.get('order_dates') is not None:
+        st.session_state.order_dates = np.append(st.session_state.order_dates, np.datetime64(order["date"][:10], 'D'))
+    update_daily_item_series(order)
+    record_change("add_order", {"order": order})
+    add_inventory_entries(build_usage_entries([order]))
     save_data()
     return order
 
@@ -159,18 +401,25 @@ def add_expense(expense_date, category, amount, description):
         "description": description
     }
     st.session_state.expenses.append(expense)
+    record_change("add_expense", {"expense": expense})
     save_data()
     return expense
 
 # Function to add a new menu item
-def add_menu_item(name, price, category):
+def add_menu_item(name, price, category, shortcut="", image=None):
     item = {
         "id": str(uuid.uuid4()),
         "name": name,
         "price": price,
         "category": category
     }
+    if shortcut.strip():
+        item["shortcut"] = shortcut.strip().upper()
+    if image:
+        item["image"] = image
     st.session_state.menu_items.append(item)
+    st.session_state.menu_version += 1
+    record_change("add_menu_item", {"item": item})
     save_data()
     return item
 
@@ -178,6 +427,8 @@ def add_menu_item(name, price, category):
 def add_menu_category(category_name):
     if category_name not in st.session_state.menu_categories:
         st.session_state.menu_categories.append(category_name)
+        st.session_state.menu_version += 1
+        record_change("add_menu_category", {"category": category_name})
         save_data()
         return True
     return False
@@ -185,21 +436,485 @@ def add_menu_category(category_name):
 # Function to delete a menu item
 def delete_menu_item(item_id):
     st.session_state.menu_items = [item for item in st.session_state.menu_items if item["id"] != item_id]
+    st.session_state.cart.pop(item_id, None)
+    st.session_state.recipes.pop(item_id, None)
+    st.session_state.recipe_matrix = None
+    st.session_state.menu_version += 1
+    record_change("delete_menu_item", {"id": item_id})
     save_data()
 
 # Function to delete an order
 def delete_order(order_id):
     st.session_state.orders = [order for order in st.session_state.orders if order["id"] != order_id]
+    st.session_state.kpi_series = None
+    st.session_state.order_dates = None
+    record_change("delete_order", {"id": order_id})
+    # Put the ingredients used by the order back into stock
+    returned = {}
+    for entry in get_order_ledger_entries().get(order_id, []):
+        for ingredient, change in entry["changes"].items():
+            returned[ingredient] = returned.get(ingredient, 0) - change
+    returned = {ingredient: change for ingredient, change in returned.items() if change}
+    if returned:
+        add_inventory_entries([new_inventory_entry("return", returned, order_id=order_id)])
+    save_data()
+
+# Function to store an uploaded image once by content hash, returns the stored file name
+def store_menu_image(data):
+    image_type = imghdr.what(None, h=data[:32])
+    if image_type not in ALLOWED_IMAGE_TYPES:
+        raise ValueError("Unsupported image type. Please upload a PNG, JPEG, GIF, BMP or WEBP file.")
+    # The header check only looks at magic bytes, so make sure the file actually decodes
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+    except Exception:
+        raise ValueError("The uploaded file is not a valid image.")
+    file_name = f"{hashlib.sha256(data).hexdigest()}.{image_type}"
+    path = os.path.join(IMAGE_DIR, file_name)
+    if not os.path.exists(path):
+        write_cached_file(path, data)
+    return file_name
+
+# Function to set the photo of an existing menu item
+def set_menu_item_image(item_id, data):
+    file_name = store_menu_image(data)
+    # Replace the item rather than changing it in place, since item dicts are shared between sessions
+    st.session_state.menu_items = [dict(item, image=file_name) if item["id"] == item_id else item for item in st.session_state.menu_items]
+    st.session_state.menu_version += 1
+    record_change("set_menu_item_image", {"id": item_id, "image": file_name})
+    save_data()
+    return file_name
+
+# Function to evict least recently used files once a disk cache directory exceeds its size limit
+def trim_disk_cache(directory, max_bytes):
+    entries = []
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Another session trimmed this file while we were walking the directory
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+# Function to get when each disk cache file was last marked as used, shared by all sessions
+@st.cache_resource
+def get_cache_last_used():
+    return {}
+
+# Function to mark a disk cache file as recently used, touching it on disk at most once per interval
+def touch_cached_file(path, interval):
+    last_used = get_cache_last_used()
+    now = time.time()
+    if now - last_used.get(path, 0) > interval:
+        last_used[path] = now
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+# Function to get the disk cache path of the thumbnail for a stored image
+def get_thumbnail_path(file_name):
+    base_name = os.path.splitext(file_name)[0]
+    return os.path.join(THUMBNAIL_DIR, f"{base_name}_{THUMBNAIL_SIZE[0]}x{THUMBNAIL_SIZE[1]}.png")
+
+# Function to get a thumbnail for a stored image, generated once and kept on disk and in memory
+@st.cache_data(max_entries=500, show_spinner=False)
+def get_thumbnail(file_name):
+    thumb_path = get_thumbnail_path(file_name)
+    if os.path.exists(thumb_path):
+        with open(thumb_path, 'rb') as f:
+            return f.read()
+    
+    image_path = os.path.join(IMAGE_DIR, file_name)
+    if not os.path.exists(image_path):
+        # Raised rather than returned, so the miss is not cached if the image shows up later
+        raise FileNotFoundError(image_path)
+    try:
+        with Image.open(image_path) as img:
+            img.thumbnail(THUMBNAIL_SIZE)
+            # PNG cannot store modes such as CMYK, so convert to RGB or RGBA first
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+            img = img.convert("RGBA" if has_alpha else "RGB")
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG", optimize=True)
+    except Exception:
+        # A broken image is shown without a photo rather than failing the whole page
+        return None
+    data = buffer.getvalue()
+    
+    write_cached_file(thumb_path, data)
+    trim_disk_cache(THUMBNAIL_DIR, THUMBNAIL_CACHE_MAX_BYTES)
+    return data
+
+# Function to mark a thumbnail as recently used for the disk cache eviction
+def mark_thumbnail_used(file_name):
+    # Thumbnails are served from memory, so touch the disk copy at most once an hour instead of on every rerun
+    touch_cached_file(get_thumbnail_path(file_name), THUMBNAIL_TOUCH_INTERVAL)
+
+# Function to show a menu item thumbnail if the item has a photo
+def show_item_thumbnail(item):
+    if item.get("image"):
+        try:
+            thumbnail = get_thumbnail(item["image"])
+        except FileNotFoundError:
+            thumbnail = None
+        if thumbnail:
+            mark_thumbnail_used(item["image"])
+            st.image(thumbnail, use_column_width=True)
+
+# Function to get the shortcut code of a menu item (explicit or initials of the name)
+def get_item_shortcut(item):
+    if item.get("shortcut"):
+        return item["shortcut"]
+    return "".join(word[0] for word in item["name"].split()).upper()
+
+# Function to build category, id and shortcut lookups for the menu in a single pass
+def build_menu_index(menu_items, menu_categories):
+    by_category = {category: [] for category in menu_categories}
+    by_id = {}
+    by_shortcut = {}
+    names = []
+    for item in menu_items:
+        # If there are items without a category, add them to Others
+        if "category" not in item:
+            item["category"] = "Others"
+        if item["category"] in by_category:
+            by_category[item["category"]].append(item)
+        by_id[item["id"]] = item
+        by_shortcut.setdefault(get_item_shortcut(item), []).append(item)
+        names.append((item["name"].lower(), item))
+    return {"by_category": by_category, "by_id": by_id, "by_shortcut": by_shortcut, "names": names}
+
+# Function to get the menu index, rebuilding it only when the menu has changed
+def get_menu_index():
+    if st.session_state.get('menu_index_version') != st.session_state.menu_version:
+        st.session_state.menu_index = build_menu_index(st.session_state.menu_items, st.session_state.menu_categories)
+        st.session_state.menu_index_version = st.session_state.menu_version
+    return st.session_state.menu_index
+
+# Function to search menu items by shortcut code or name
+def search_menu_items(menu_index, query):
+    query = query.strip()
+    if not query:
+        return []
+    # Exact shortcut matches come first, followed by name prefix and then substring matches
+    results = list(menu_index["by_shortcut"].get(query.upper(), []))
+    seen = {item["id"] for item in results}
+    query = query.lower()
+    prefix_matches = []
+    other_matches = []
+    for name, item in menu_index["names"]:
+        if item["id"] in seen:
+            continue
+        if name.startswith(query):
+            prefix_matches.append(item)
+        elif query in name:
+            other_matches.append(item)
+    return results + prefix_matches + other_matches
+
+# Function to change the quantity of an item in the cart
+def update_cart(item_id, delta):
+    quantity = st.session_state.cart.get(item_id, 0) + delta
+    if quantity > 0:
+        st.session_state.cart[item_id] = min(quantity, 100)
+    else:
+        st.session_state.cart.pop(item_id, None)
+
+# Function to clear the cart
+def clear_cart():
+    st.session_state.cart = {}
+
+# Function to turn the cart into order items
+def get_cart_order_items(menu_index):
+    order_items = []
+    total_amount = 0
+    for item_id, quantity in st.session_state.cart.items():
+        item = menu_index["by_id"].get(item_id)
+        if item is None:
+            continue
+        subtotal = quantity * item['price']
+        total_amount += subtotal
+        order_items.append({
+            "id": item["id"],
+            "name": item["name"],
+            "price": item["price"],
+            "quantity": quantity,
+            "subtotal": subtotal
+        })
+    return order_items, total_amount
+
+# Function to build daily per-item quantity and revenue series from orders in one pass
+def build_daily_item_series(orders):
+    lines = [
+        (order["date"][:10], order["id"], item["name"], item["quantity"], item["subtotal"])
+        for order in orders
+        for item in order["items"]
+    ]
+    lines_df = pd.DataFrame(lines, columns=["Date", "Order", "Item", "Quantity", "Revenue"])
+    lines_df["Date"] = pd.to_datetime(lines_df["Date"], format="%Y-%m-%d")
+    return {
+        "quantity": lines_df.pivot_table(index="Date", columns="Item", values="Quantity", aggfunc="sum", fill_value=0).astype(float),
+        "revenue": lines_df.pivot_table(index="Date", columns="Item", values="Revenue", aggfunc="sum", fill_value=0).astype(float),
+        "orders": lines_df.groupby("Date")["Order"].nunique().astype(float)
+    }
+
+# Function to get the daily per-item series, building it only when it is missing
+def get_daily_item_series():
+    if st.session_state.get('kpi_series') is None:
+        st.session_state.kpi_series = build_daily_item_series(st.session_state.orders)
+    return st.session_state.kpi_series
+
+# Function to add a new order to the daily per-item series without rebuilding it
+def update_daily_item_series(order):
+    series = st.session_state.get('kpi_series')
+    if series is None:
+        return
+    day = pd.Timestamp(order["date"][:10])
+    for key, field in (("quantity", "quantity"), ("revenue", "subtotal")):
+        frame = series[key]
+        # Add new item columns before new rows, since a frame without columns cannot grow rows
+        for item in order["items"]:
+            if item["name"] not in frame.columns:
+                frame[item["name"]] = 0.0
+        if day not in frame.index:
+            frame = frame.reindex(frame.index.union([day]), fill_value=0.0)
+        for item in order["items"]:
+            frame.loc[day, item["name"]] += item[field]
+        series[key] = frame
+    orders = series["orders"]
+    if day not in orders.index:
+        orders = orders.reindex(orders.index.union([day]), fill_value=0.0)
+    orders.loc[day] += 1
+    series["orders"] = orders
+
+# Function to compute period-over-period and rolling KPIs for a date range
+def compute_kpis(series, start_date, end_date):
+    days = (end_date - start_date).days + 1
+    prev_start = pd.Timestamp(start_date - timedelta(days=days))
+    prev_end = pd.Timestamp(start_date - timedelta(days=1))
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    
+    # Cover the previous period and enough history for the 28-day averages at both ends of the comparison
+    index = pd.date_range(min(prev_start, end - timedelta(days=55)), end, freq="D")
+    revenue = series["revenue"].reindex(index, fill_value=0.0)
+    quantity = series["quantity"].reindex(index, fill_value=0.0)
+    orders = series["orders"].reindex(index, fill_value=0.0)
+    
+    daily_sales = revenue.sum(axis=1)
+    trend = pd.DataFrame({
+        "Sales": daily_sales,
+        "7-Day Avg": daily_sales.rolling(7, min_periods=1).mean(),
+        "28-Day Avg": daily_sales.rolling(28, min_periods=1).mean()
+    })
+    
+    item_growth = pd.DataFrame({
+        "Quantity": quantity.loc[start:end].sum(),
+        "Revenue": revenue.loc[start:end].sum(),
+        "Previous Revenue": revenue.loc[prev_start:prev_end].sum()
+    })
+    item_growth = item_growth[(item_growth["Revenue"] > 0) | (item_growth["Previous Revenue"] > 0)]
+    item_growth["Growth %"] = (item_growth["Revenue"] - item_growth["Previous Revenue"]) / item_growth["Previous Revenue"].replace(0, np.nan) * 100
+    item_growth = item_growth.rename_axis("Item").reset_index().sort_values(by="Revenue", ascending=False)
+    
+    return {
+        "sales": daily_sales.loc[start:end].sum(),
+        "previous_sales": daily_sales.loc[prev_start:prev_end].sum(),
+        "orders": int(orders.loc[start:end].sum()),
+        "previous_orders": int(orders.loc[prev_start:prev_end].sum()),
+        "avg_7": trend["7-Day Avg"].iloc[-1],
+        "previous_avg_7": trend["7-Day Avg"].iloc[-8],
+        "avg_28": trend["28-Day Avg"].iloc[-1],
+        "previous_avg_28": trend["28-Day Avg"].iloc[-29],
+        "trend": trend.loc[start:end],
+        "item_growth": item_growth
+    }
+
+# Function to format the change between two values as a percentage for st.metric
+def format_change(current, previous):
+    if not previous:
+        return None
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+# Function to add a new ingredient
+def add_ingredient(name, unit, low_stock_level):
+    if any(ingredient["name"] == name for ingredient in st.session_state.ingredients):
+        return False
+    ingredient = {"name": name, "unit": unit, "low_stock_level": low_stock_level}
+    st.session_state.ingredients.append(ingredient)
+    st.session_state.recipe_matrix = None
+    st.session_state.stock_levels = None
+    record_change("add_ingredient", {"ingredient": ingredient})
+    save_data()
+    return True
+
+# Function to set the recipe of a menu item (ingredient name -> quantity per item)
+def set_recipe(item_id, quantities):
+    recipe = {ingredient: quantity for ingredient, quantity in quantities.items() if quantity > 0}
+    if recipe:
+        st.session_state.recipes[item_id] = recipe
+    else:
+        st.session_state.recipes.pop(item_id, None)
+    st.session_state.recipe_matrix = None
+    record_change("set_recipe", {"id": item_id, "recipe": recipe})
     save_data()
 
+# Function to create a stock ledger entry (positive changes add stock, negative changes use it)
+def new_inventory_entry(entry_type, changes, order_id=None, note=""):
+    entry = {
+        "id": str(uuid.uuid4()),
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "type": entry_type,
+        "changes": changes
+    }
+    if order_id:
+        entry["order_id"] = order_id
+    if note:
+        entry["note"] = note
+    return entry
+
+# Function to append entries to the stock ledger and keep stock levels current
+def add_inventory_entries(entries):
+    if not entries:
+        return
+    st.session_state.inventory_ledger.extend(entries)
+    entries_by_order = st.session_state.get('order_ledger_entries')
+    if entries_by_order is not None:
+        for entry in entries:
+            if entry.get("order_id"):
+                entries_by_order.setdefault(entry["order_id"], []).append(entry)
+    stock_levels = st.session_state.get('stock_levels')
+    if stock_levels is not None:
+        for entry in entries:
+            for ingredient, change in entry["changes"].items():
+                stock_levels[ingredient] = stock_levels.get(ingredient, 0) + change
+    for start in range(0, len(entries), INVENTORY_FEED_BATCH_SIZE):
+        record_change("add_inventory_entries", {"entries": entries[start:start + INVENTORY_FEED_BATCH_SIZE]})
+
+# Function to get the stock ledger entries of each order, building the lookup only when it is missing
+def get_order_ledger_entries():
+    if st.session_state.get('order_ledger_entries') is None:
+        entries_by_order = {}
+        for entry in st.session_state.inventory_ledger:
+            if entry.get("order_id"):
+                entries_by_order.setdefault(entry["order_id"], []).append(entry)
+        st.session_state.order_ledger_entries = entries_by_order
+    return st.session_state.order_ledger_entries
+
+# Function to get the recipe matrix (menu items x ingredients), rebuilding it only when recipes change
+def get_recipe_matrix():
+    if st.session_state.get('recipe_matrix') is None:
+        ingredient_names = [ingredient["name"] for ingredient in st.session_state.ingredients]
+        ingredient_index = {name: i for i, name in enumerate(ingredient_names)}
+        item_ids = list(st.session_state.recipes.keys())
+        matrix = np.zeros((len(item_ids), len(ingredient_names)))
+        for row, item_id in enumerate(item_ids):
+            for ingredient, quantity in st.session_state.recipes[item_id].items():
+                if ingredient in ingredient_index:
+                    matrix[row, ingredient_index[ingredient]] = quantity
+        st.session_state.recipe_matrix = {
+            "items": {item_id: row for row, item_id in enumerate(item_ids)},
+            "ingredients": ingredient_names,
+            "matrix": matrix
+        }
+    return st.session_state.recipe_matrix
+
+# Function to expand a batch of orders into ingredient usage (orders x ingredients)
+def expand_recipe_usage(orders):
+    recipe_matrix = get_recipe_matrix()
+    usage = np.zeros((len(orders), len(recipe_matrix["ingredients"])))
+    # Flatten the order lines into arrays, forming a sparse orders x menu items matrix in coordinate form
+    line_counts = np.fromiter((len(order["items"]) for order in orders), dtype=int, count=len(orders))
+    lines = [item for order in orders for item in order["items"]]
+    if not lines:
+        return usage, recipe_matrix["ingredients"]
+    rows = np.repeat(np.arange(len(orders)), line_counts)
+    cols = pd.Series([item["id"] for item in lines]).map(recipe_matrix["items"]).to_numpy()
+    quantities = np.fromiter((item["quantity"] for item in lines), dtype=float, count=len(lines))
+    # Lines for items without a recipe use no stock
+    has_recipe = ~np.isnan(cols)
+    rows, cols, quantities = rows[has_recipe], cols[has_recipe].astype(int), quantities[has_recipe]
+    # Sparse x dense multiply: scale each line's recipe row and add it into its order's row
+    np.add.at(usage, rows, quantities[:, None] * recipe_matrix["matrix"][cols])
+    return usage, recipe_matrix["ingredients"]
+
+# Function to build usage ledger entries for a batch of orders
+def build_usage_entries(orders):
+    usage, ingredient_names = expand_recipe_usage(orders)
+    # Find every non-zero cell at once and split them into one run per order (np.nonzero returns them row by row)
+    rows, cols = np.nonzero(usage)
+    amounts = -usage[rows, cols]
+    order_rows, starts = np.unique(rows, return_index=True)
+    entries = []
+    for row, used, used_amounts in zip(order_rows, np.split(cols, starts[1:]), np.split(amounts, starts[1:])):
+        order = orders[row]
+        entry = new_inventory_entry("usage", dict(zip([ingredient_names[i] for i in used], used_amounts.tolist())), order_id=order["id"])
+        entry["date"] = order["date"]
+        entries.append(entry)
+    return entries
+
+# Function to record ingredient usage for past orders that have none yet
+def backfill_inventory_usage():
+    recorded = get_order_ledger_entries()
+    entries = build_usage_entries([order for order in st.session_state.orders if order["id"] not in recorded])
+    if entries:
+        add_inventory_entries(entries)
+        save_data()
+    st.session_state.backfilled_orders = len(entries)
+    return len(entries)
+
+# Function to sum the stock ledger into stock levels per ingredient
+def build_stock_levels(ingredients, inventory_ledger):
+    stock_levels = {ingredient["name"]: 0 for ingredient in ingredients}
+    for entry in inventory_ledger:
+        for ingredient, change in entry["changes"].items():
+            stock_levels[ingredient] = stock_levels.get(ingredient, 0) + change
+    return stock_levels
+
+# Function to get current stock levels, summing the ledger only when they are missing
+def get_stock_levels():
+    if st.session_state.get('stock_levels') is None:
+        st.session_state.stock_levels = build_stock_levels(st.session_state.ingredients, st.session_state.inventory_ledger)
+    return st.session_state.stock_levels
+
+# Function to get ingredients at or below their low-stock level
+def get_low_stock_ingredients():
+    stock_levels = get_stock_levels()
+    return [
+        (ingredient, stock_levels.get(ingredient["name"], 0))
+        for ingredient in st.session_state.ingredients
+        if stock_levels.get(ingredient["name"], 0) <= ingredient["low_stock_level"]
+    ]
+
+# Function to parse the order dates once into an array aligned with the orders list
+def build_order_date_index(orders):
+    return np.array([order["date"][:10] for order in orders], dtype="datetime64[D]")
+
+# Function to get the order date index, rebuilding it only when it is missing or out of step
+def get_order_date_index():
+    order_dates = st.session_state.get('order_dates')
+    if order_dates is None or len(order_dates) != len(st.session_state.orders):
+        order_dates = build_order_date_index(st.session_state.orders)
+        st.session_state.order_dates = order_dates
+    return order_dates
+
 # Function to filter orders by date range
 def filter_orders_by_date(orders, start_date, end_date):
-    filtered_orders = []
-    for order in orders:
-        order_date = datetime.strptime(order["date"], "%Y-%m-%d %H:%M:%S").date()
-        if start_date <= order_date <= end_date:
-            filtered_orders.append(order)
-    return filtered_orders
+    order_dates = get_order_date_index() if orders is st.session_state.orders else build_order_date_index(orders)
+    in_range = (order_dates >= np.datetime64(start_date, 'D')) & (order_dates <= np.datetime64(end_date, 'D'))
+    return [orders[i] for i in np.flatnonzero(in_range)]
 
 # Function to filter expenses by date range
 def filter_expenses_by_date(expenses, start_date, end_date):
@@ -210,6 +925,10 @@ def filter_expenses_by_date(expenses, start_date, end_date):
             filtered_expenses.append(expense)
     return filtered_expenses
 
+# Columns of the exported reports
+ORDER_REPORT_COLUMNS = ["Order ID", "Date", "Time", "Item", "Quantity", "Price", "Subtotal"]
+EXPENSE_REPORT_COLUMNS = ["Expense ID", "Date", "Category", "Amount", "Description"]
+
 # Function to export orders to Excel
 def export_orders_to_excel(orders):
     if not orders:
@@ -230,7 +949,7 @@ def export_orders_to_excel(orders):
                 "Subtotal": item["subtotal"]
             })
     
-    df = pd.DataFrame(order_data)
+    df = pd.DataFrame(order_data, columns=ORDER_REPORT_COLUMNS)
     return df
 
 # Function to export expenses to Excel
@@ -249,142 +968,281 @@ def export_expenses_to_excel(expenses):
             "Description": expense["description"]
         })
     
-    df = pd.DataFrame(expense_data)
+    df = pd.DataFrame(expense_data, columns=EXPENSE_REPORT_COLUMNS)
     return df
 
+# Function to read a file from a disk cache, marking it as recently used
+def read_cached_file(path):
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Report exporters with their columns and the day each record belongs to
+REPORT_TYPES = {
+    "sales": (export_orders_to_excel, ORDER_REPORT_COLUMNS, lambda order: order["date"][:10]),
+    "expenses": (export_expenses_to_excel, EXPENSE_REPORT_COLUMNS, lambda expense: expense["date"])
+}
+
+# Function to get the cache path of a report for a date range at the current data version
+def get_report_path(report_type, start_date, end_date):
+    return os.path.join(REPORT_CACHE_DIR, f"{report_type}_{start_date}_{end_date}_v{st.session_state.data_version.replace(':', '_')}.csv")
+
+# Function to get a previously generated report CSV, or None if it has to be built
+def get_cached_report(report_type, start_date, end_date):
+    path = get_report_path(report_type, start_date, end_date)
+    try:
+        report = load_cached_report(path)
+    except FileNotFoundError:
+        return None
+    # Every rerun draws both report tabs, so the disk copy is only touched once an hour
+    touch_cached_file(path, REPORT_TOUCH_INTERVAL)
+    return report
+
+# Function to read a cached report once per process (a report path is never rewritten, since it includes the data version)
+@st.cache_resource(max_entries=20, show_spinner=False)
+def load_cached_report(path):
+    # A missing report raises instead of returning None, so the miss is not cached
+    with open(path, 'rb') as f:
+        return f.read()
+
+# Function to build a report CSV, reusing precomputed chunks for closed past days
+def build_report_csv(report_type, records, start_date, end_date):
+    export, columns, get_day = REPORT_TYPES[report_type]
+    
+    records_by_day = {}
+    for record in records:
+        records_by_day.setdefault(get_day(record), []).append(record)
+    
+    today = datetime.now().strftime("%Y-%m-%d")
+    parts = [pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8')]
+    for day in sorted(records_by_day):
+        day_records = records_by_day[day]
+        chunk_path = None
+        if day < today:
+            # Closed days are keyed by their content, so edits to a past day build a new chunk
+            digest = hashlib.sha256(json.dumps(day_records, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            chunk_path = os.path.join(REPORT_CHUNK_DIR, f"{report_type}_{day}_{digest}.csv")
+            chunk = read_cached_file(chunk_path)
+            if chunk is not None:
+                parts.append(chunk)
+                continue
+        chunk = export(day_records).to_csv(index=False, header=False).encode('utf-8')
+        if chunk_path:
+            write_cached_file(chunk_path, chunk)
+        parts.append(chunk)
+    
+    report = b"".join(parts)
+    write_cached_file(get_report_path(report_type, start_date, end_date), report)
+    trim_disk_cache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
+    return report
+
+# Load data at startup
+load_data()
+
 # Main App UI
 st.title("🍔 Jayubhai Dabeli Wala")
 
 # Create tabs for different sections
-tabs = st.tabs(["📝 New Order", "📊 Sales Report", "🍕 Menu Management", "💰 Expenses", "📈 Dashboard"])
+tabs = st.tabs(["📝 New Order", "📊 Sales Report", "🍕 Menu Management", "💰 Expenses", "📈 Dashboard", "📦 Inventory"])
 
 # Tab 1: New Order
 with tabs[0]:
     st.header("Create New Order")
     
+    menu_index = get_menu_index()
+    
+    # Large menus default to quick entry, which only renders the open category
+    order_mode = st.radio(
+        "Order entry mode",
+        ORDER_MODES,
+        index=1 if len(menu_index["by_id"]) > LARGE_MENU_THRESHOLD else 0,
+        horizontal=True,
+        key="order_mode"
+    )
+    
+    # Low-stock alert so the counter sees shortages while taking orders
+    low_stock = get_low_stock_ingredients()
+    if low_stock:
+        st.warning("Low stock: " + ", ".join(f"{ingredient['name']} ({stock:g} {ingredient['unit']})" for ingredient, stock in low_stock))
+    
+    # Show confirmation for an order completed on the previous run
+    if 'last_order_id' in st.session_state:
+        st.success(f"Order added successfully! Order ID: {st.session_state.pop('last_order_id')[:8]}")
+    
     # Create columns for better layout
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # Create a form for order entry
-        with st.form(key="order_form"):
-            # Reset order_completed flag if an order was just completed
-            if st.session_state.order_completed:
-                reset_order_form()
-                st.session_state.order_completed = False
-                
-            order_items = []
-            total_amount = 0
-            
-            # Group menu items by their categories
-            menu_categories_dict = {}
-            for category in st.session_state.menu_categories:
-                menu_categories_dict[category] = [item for item in st.session_state.menu_items if item.get("category", "Others") == category]
-            
-            # If there are items without a category, add them to Others
-            for item in st.session_state.menu_items:
-                if "category" not in item:
-                    item["category"] = "Others"
-            
-            # Add horizontal scrolling for category tabs
-            st.markdown("""
-            <style>
-            .stTabs [data-baseweb="tab-list"] {
-                flex-wrap: nowrap;
-                overflow-x: auto;
-                white-space: nowrap;
-                padding-bottom: 5px;
-            }
-            .stTabs [data-baseweb="tab"] {
-                display: inline-block;
-                min-width: 100px;
-                text-align: center;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            # Display menu items with tabs for categories
-            category_tabs = st.tabs(list(menu_categories_dict.keys()))
+        if order_mode == "Quick":
+            search_query = st.text_input("Search by name or shortcut", key="order_search", placeholder="e.g. VP or vada")
             
-            for i, category in enumerate(menu_categories_dict.keys()):
-                with category_tabs[i]:
-                    if not menu_categories_dict[category]:
-                        st.info(f"No items in {category} category.")
-                        continue
-                        
-                    # Create a grid layout for items (3 columns)
-                    items_in_category = menu_categories_dict[category]
-                    rows = [items_in_category[i:i+3] for i in range(0, len(items_in_category), 3)]
-                    
-                    for row in rows:
-                        cols = st.columns(3)
-                        for i, item in enumerate(row):
-                            with cols[i]:
-                                st.write(f"**{item['name']}**")
-                                st.write(f"₹{item['price']}")
-                                
-                                # Initialize quantity to 0 or get existing value
-                                qty_key = f"qty_{item['id']}"
-                                quantity = st.number_input(f"Qty", min_value=0, max_value=100, 
-                                                          value=st.session_state.get(qty_key, 0), 
-                                                          step=1, key=qty_key)
-                                
-                                if quantity > 0:
-                                    subtotal = quantity * item['price']
-                                    st.write(f"Subtotal: ₹{subtotal}")
-                                    total_amount += subtotal
-                                    order_items.append({
-                                        "id": item["id"],
-                                        "name": item["name"],
-                                        "price": item["price"],
-                                        "quantity": quantity,
-                                        "subtotal": subtotal
-                                    })
-            
-            st.markdown("---")
-            st.markdown(f"### Total: ₹{total_amount}")
-            
-            # Make the Complete Order button more prominent
-            st.markdown("""
-            <style>
-            div[data-testid="stFormSubmitButton"] > button {
-                background-color: #4CAF50;
-                color: white;
-                font-size: 20px;
-                font-weight: bold;
-                padding: 15px 25px;
-                width: 100%;
-                margin-top: 15px;
-                border-radius: 8px;
-                box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                transition: all 0.3s ease;
-            }
-            div[data-testid="stFormSubmitButton"] > button:hover {
-                background-color: #45a049;
-                box-shadow: 0 6px 8px rgba(0,0,0,0.15);
-                transform: translateY(-2px);
-            }
-            </style>
-            """, unsafe_allow_html=True)
+            if search_query.strip():
+                visible_items = search_menu_items(menu_index, search_query)
+                st.caption(f"{len(visible_items)} matching item(s)")
+            else:
+                categories = list(menu_index["by_category"].keys())
+                selected_category = st.radio("Category", categories, horizontal=True, key="order_category")
+                visible_items = menu_index["by_category"].get(selected_category, [])
             
-            submit_button = st.form_submit_button(label="COMPLETE ORDER", help="Click to complete your order")
+            if not visible_items:
+                st.info("No matching items.")
             
-            if submit_button and order_items:
-                # Filter out items with zero quantity
-                order_items = [item for item in order_items if item["quantity"] > 0]
-                if order_items:
-                    new_order = add_order(order_items, total_amount)
-                    st.success(f"Order added successfully! Order ID: {new_order['id'][:8]}")
-                    
-                    # Set order_completed flag to true
-                    st.session_state.order_completed = True
+            # Tap an item to add it to the cart (4 columns)
+            for row_start in range(0, len(visible_items), 4):
+                cols = st.columns(4)
+                for i, item in enumerate(visible_items[row_start:row_start+4]):
+                    with cols[i]:
+                        show_item_thumbnail(item)
+                        in_cart = st.session_state.cart.get(item["id"], 0)
+                        label = f"{item['name']} · ₹{item['price']}"
+                        if in_cart:
+                            label += f" ({in_cart})"
+                        st.button(label, key=f"add_{item['id']}", help=get_item_shortcut(item),
+                                  on_click=update_cart, args=(item["id"], 1), use_container_width=True)
+        else:
+            # Create a form for order entry
+            with st.form(key="order_form"):
+                # Reset order_completed flag if an order was just completed
+                if st.session_state.order_completed:
+                    reset_order_form()
+                    st.session_state.order_completed = False
                     
-                    # Rerun the app to apply the reset
-                    st.experimental_rerun()
-                else:
-                    st.warning("Please select at least one item to place an order.")
+                order_items = []
+                total_amount = 0
+                
+                # Menu items grouped by their categories
+                menu_categories_dict = menu_index["by_category"]
+                
+                # Add horizontal scrolling for category tabs
+                st.markdown("""
+                <style>
+                .stTabs [data-baseweb="tab-list"] {
+                    flex-wrap: nowrap;
+                    overflow-x: auto;
+                    white-space: nowrap;
+                    padding-bottom: 5px;
+                }
+                .stTabs [data-baseweb="tab"] {
+                    display: inline-block;
+                    min-width: 100px;
+                    text-align: center;
+                }
+                </style>
+                """, unsafe_allow_html=True)
+                
+                # Display menu items with tabs for categories
+                category_tabs = st.tabs(list(menu_categories_dict.keys()))
+                
+                for i, category in enumerate(menu_categories_dict.keys()):
+                    with category_tabs[i]:
+                        if not menu_categories_dict[category]:
+                            st.info(f"No items in {category} category.")
+                            continue
+                            
+                        # Create a grid layout for items (3 columns)
+                        items_in_category = menu_categories_dict[category]
+                        rows = [items_in_category[i:i+3] for i in range(0, len(items_in_category), 3)]
+                        
+                        for row in rows:
+                            cols = st.columns(3)
+                            for i, item in enumerate(row):
+                                with cols[i]:
+                                    show_item_thumbnail(item)
+                                    st.write(f"**{item['name']}**")
+                                    st.write(f"₹{item['price']}")
+                                    
+                                    # Initialize quantity to 0 or get existing value
+                                    qty_key = f"qty_{item['id']}"
+                                    quantity = st.number_input(f"Qty", min_value=0, max_value=100, 
+                                                              value=st.session_state.get(qty_key, 0), 
+                                                              step=1, key=qty_key)
+                                    
+                                    if quantity > 0:
+                                        subtotal = quantity * item['price']
+                                        st.write(f"Subtotal: ₹{subtotal}")
+                                        total_amount += subtotal
+                                        order_items.append({
+                                            "id": item["id"],
+                                            "name": item["name"],
+                                            "price": item["price"],
+                                            "quantity": quantity,
+                                            "subtotal": subtotal
+                                        })
+                
+                st.markdown("---")
+                st.markdown(f"### Total: ₹{total_amount}")
+                
+                # Make the Complete Order button more prominent
+                st.markdown("""
+                <style>
+                div[data-testid="stFormSubmitButton"] > button {
+                    background-color: #4CAF50;
+                    color: white;
+                    font-size: 20px;
+                    font-weight: bold;
+                    padding: 15px 25px;
+                    width: 100%;
+                    margin-top: 15px;
+                    border-radius: 8px;
+                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+                    transition: all 0.3s ease;
+                }
+                div[data-testid="stFormSubmitButton"] > button:hover {
+                    background-color: #45a049;
+                    box-shadow: 0 6px 8px rgba(0,0,0,0.15);
+                    transform: translateY(-2px);
+                }
+                </style>
+                """, unsafe_allow_html=True)
+                
+                submit_button = st.form_submit_button(label="COMPLETE ORDER", help="Click to complete your order")
+                
+                if submit_button and order_items:
+                    # Filter out items with zero quantity
+                    order_items = [item for item in order_items if item["quantity"] > 0]
+                    if order_items:
+                        new_order = add_order(order_items, total_amount)
+                        st.success(f"Order added successfully! Order ID: {new_order['id'][:8]}")
+                        
+                        # Set order_completed flag to true
+                        st.session_state.order_completed = True
+                        
+                        # Rerun the app to apply the reset
+                        st.experimental_rerun()
+                    else:
+                        st.warning("Please select at least one item to place an order.")
     
     with col2:
+        if order_mode == "Quick":
+            # Compact cart widget
+            st.subheader("Cart")
+            cart_items, cart_total = get_cart_order_items(menu_index)
+            
+            if cart_items:
+                for item in cart_items:
+                    col_line, col_minus = st.columns([5, 1])
+                    with col_line:
+                        st.write(f"{item['name']} x {item['quantity']} = ₹{item['subtotal']}")
+                    with col_minus:
+                        st.button("➖", key=f"dec_{item['id']}", on_click=update_cart, args=(item["id"], -1))
+                st.markdown(f"### Total: ₹{cart_total}")
+                
+                col_complete, col_clear = st.columns([3, 1])
+                with col_complete:
+                    if st.button("COMPLETE ORDER", key="complete_quick_order", use_container_width=True):
+                        new_order = add_order(cart_items, cart_total)
+                        clear_cart()
+                        st.session_state.last_order_id = new_order["id"]
+                        st.experimental_rerun()
+                with col_clear:
+                    st.button("Clear", key="clear_cart", on_click=clear_cart, use_container_width=True)
+            else:
+                st.info("Cart is empty. Tap items to add them.")
+            
+            st.markdown("---")
+        
         st.subheader("Recent Orders")
         # Display recent orders
         recent_orders = sorted(st.session_state.orders, key=lambda x: x["date"], reverse=True)[:5]
@@ -408,9 +1266,9 @@ with tabs[1]:
     # Date range selector
     col1, col2 = st.columns(2)
     with col1:
-        start_date = st.date_input("Start Date", datetime.now().date() - timedelta(days=7))
+        start_date = st.date_input("Start Date", datetime.now().date() - timedelta(days=7), key="sales_start")
     with col2:
-        end_date = st.date_input("End Date", datetime.now().date())
+        end_date = st.date_input("End Date", datetime.now().date(), key="sales_end")
     
     if start_date > end_date:
         st.error("Error: End date must be after start date.")
@@ -485,10 +1343,14 @@ with tabs[1]:
                 st.subheader("Detailed Sales Data")
                 st.dataframe(sales_df.sort_values(by="Revenue", ascending=False))
                 
-                # Export to Excel button
-                orders_df = export_orders_to_excel(filtered_orders)
-                if orders_df is not None:
-                    csv = orders_df.to_csv(index=False).encode('utf-8')
+                # Export to Excel button, the CSV is only built on request and then served from the cache
+                csv = get_cached_report("sales", start_date, end_date)
+                if csv is None:
+                    prepare_slot = st.empty()
+                    if prepare_slot.button("Prepare Sales Report CSV", key="prepare_sales_csv"):
+                        csv = build_report_csv("sales", filtered_orders, start_date, end_date)
+                        prepare_slot.empty()
+                if csv is not None:
                     st.download_button(
                         label="Download Sales Report as CSV",
                         data=csv,
@@ -511,7 +1373,7 @@ with tabs[2]:
         st.subheader("Add New Item")
         
         # Add tabs for item and category management
-        item_tabs = st.tabs(["Add Item", "Add Category"])
+        item_tabs = st.tabs(["Add Item", "Add Category", "Item Photo"])
         
         # Tab for adding new menu item
         with item_tabs[0]:
@@ -519,11 +1381,18 @@ with tabs[2]:
                 new_item_name = st.text_input("Item Name")
                 new_item_price = st.number_input("Price (₹)", min_value=1, value=20)
                 new_item_category = st.selectbox("Category", options=st.session_state.menu_categories)
+                new_item_shortcut = st.text_input("Shortcut (optional)", help="Short code for quick order search, e.g. VP. Defaults to the initials of the name.")
+                new_item_photo = st.file_uploader("Photo (optional)", type=ALLOWED_IMAGE_TYPES, key="new_item_photo")
                 submit_button = st.form_submit_button(label="Add Item")
                 
                 if submit_button and new_item_name:
-                    new_item = add_menu_item(new_item_name, new_item_price, new_item_category)
-                    st.success(f"Added {new_item_name} to the menu!")
+                    try:
+                        new_item_image = store_menu_image(new_item_photo.getvalue()) if new_item_photo else None
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        new_item = add_menu_item(new_item_name, new_item_price, new_item_category, new_item_shortcut, new_item_image)
+                        st.success(f"Added {new_item_name} to the menu!")
         
         # Tab for adding new category
         with item_tabs[1]:
@@ -537,6 +1406,23 @@ with tabs[2]:
                     else:
                         st.warning(f"Category {new_category_name} already exists!")
                 st.success(f"Added {new_item_name} to the menu!")
+        
+        # Tab for setting the photo of an existing item
+        with item_tabs[2]:
+            with st.form(key="item_photo_form"):
+                menu_index = get_menu_index()
+                photo_item_options = {f"{item['name']} ({item_id[:8]})": item_id for item_id, item in menu_index["by_id"].items()}
+                photo_item_label = st.selectbox("Item", options=list(photo_item_options.keys()))
+                photo_item_id = photo_item_options.get(photo_item_label)
+                item_photo = st.file_uploader("Photo", type=ALLOWED_IMAGE_TYPES, key="item_photo")
+                photo_submit_button = st.form_submit_button(label="Save Photo")
+                
+                if photo_submit_button and photo_item_id and item_photo:
+                    try:
+                        set_menu_item_image(photo_item_id, item_photo.getvalue())
+                        st.success(f"Updated photo for {menu_index['by_id'][photo_item_id]['name']}!")
+                    except ValueError as e:
+                        st.error(str(e))
     
     with col2:
         st.subheader("Current Menu Items")
@@ -653,10 +1539,14 @@ with tabs[3]:
                 expense_details_df = pd.DataFrame(expense_details)
                 st.dataframe(expense_details_df.sort_values(by="Date", ascending=False))
                 
-                # Export to Excel button
-                expenses_df = export_expenses_to_excel(filtered_expenses)
-                if expenses_df is not None:
-                    csv = expenses_df.to_csv(index=False).encode('utf-8')
+                # Export to Excel button, the CSV is only built on request and then served from the cache
+                csv = get_cached_report("expenses", exp_start_date, exp_end_date)
+                if csv is None:
+                    prepare_slot = st.empty()
+                    if prepare_slot.button("Prepare Expense Report CSV", key="prepare_expense_csv"):
+                        csv = build_report_csv("expenses", filtered_expenses, exp_start_date, exp_end_date)
+                        prepare_slot.empty()
+                if csv is not None:
                     st.download_button(
                         label="Download Expense Report as CSV",
                         data=csv,
@@ -702,6 +1592,51 @@ with tabs[4]:
         with col4:
             st.markdown("<div class='metric-card'><div class='metric-value'>{:.1f}%</div><div class='metric-label'>Profit Margin</div></div>".format(profit_margin), unsafe_allow_html=True)
         
+        # Trend metrics compared with the previous period of the same length
+        kpis = compute_kpis(get_daily_item_series(), dash_start_date, dash_end_date)
+        st.subheader("Trends")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Sales vs Previous Period", f"₹{kpis['sales']:,.2f}", format_change(kpis["sales"], kpis["previous_sales"]))
+        with col2:
+            st.metric("Orders vs Previous Period", kpis["orders"], format_change(kpis["orders"], kpis["previous_orders"]))
+        with col3:
+            st.metric("7-Day Avg Daily Sales", f"₹{kpis['avg_7']:,.2f}", format_change(kpis["avg_7"], kpis["previous_avg_7"]), help="Compared with the week before")
+        with col4:
+            st.metric("28-Day Avg Daily Sales", f"₹{kpis['avg_28']:,.2f}", format_change(kpis["avg_28"], kpis["previous_avg_28"]), help="Compared with the 28 days before")
+        
+        if kpis["sales"] or kpis["previous_sales"]:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                # Sales with moving averages
+                trend = kpis["trend"]
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=trend.index, y=trend["Sales"], mode='lines', name='Sales', line=dict(color='green', width=1)))
+                fig.add_trace(go.Scatter(x=trend.index, y=trend["7-Day Avg"], mode='lines', name='7-Day Avg', line=dict(color='orange', width=2)))
+                fig.add_trace(go.Scatter(x=trend.index, y=trend["28-Day Avg"], mode='lines', name='28-Day Avg', line=dict(color='purple', width=2)))
+                fig.update_layout(
+                    title="Sales Moving Averages",
+                    height=300,
+                    margin=dict(l=10, r=10, t=40, b=10),
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                    hovermode="x unified"
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            
+            with col2:
+                # Per-item growth against the previous period
+                st.dataframe(
+                    kpis["item_growth"],
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "Revenue": st.column_config.NumberColumn(format="₹%.2f"),
+                        "Previous Revenue": st.column_config.NumberColumn(format="₹%.2f"),
+                        "Growth %": st.column_config.NumberColumn(format="%+.1f%%")
+                    }
+                )
+        
         # Create daily sales and expenses chart
         if filtered_orders or filtered_expenses:
             st.subheader("Daily Sales & Expenses")
@@ -783,6 +1718,114 @@ with tabs[4]:
         else:
             st.info("No data available for the selected date range.")
 
+# Tab 6: Inventory
+with tabs[5]:
+    st.header("Inventory")
+    
+    # Create two columns for better layout
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        inventory_tabs = st.tabs(["Stock Entry", "Add Ingredient", "Recipes"])
+        ingredient_names = [ingredient["name"] for ingredient in st.session_state.ingredients]
+        
+        # Tab for recording purchases and stock adjustments
+        with inventory_tabs[0]:
+            if not ingredient_names:
+                st.info("Add ingredients to start tracking stock.")
+            else:
+                with st.form(key="stock_entry_form"):
+                    stock_ingredient = st.selectbox("Ingredient", options=ingredient_names)
+                    stock_entry_type = st.selectbox("Type", ["purchase", "adjustment"])
+                    stock_quantity = st.number_input("Quantity", value=0.0, step=1.0, help="Use a negative quantity to remove stock, e.g. for waste")
+                    stock_note = st.text_input("Note")
+                    stock_submit_button = st.form_submit_button(label="Record Stock")
+                    
+                    if stock_submit_button and stock_quantity:
+                        add_inventory_entries([new_inventory_entry(stock_entry_type, {stock_ingredient: stock_quantity}, note=stock_note)])
+                        save_data()
+                        st.success(f"Recorded {stock_quantity:g} for {stock_ingredient}!")
+        
+        # Tab for adding new ingredient
+        with inventory_tabs[1]:
+            with st.form(key="add_ingredient_form"):
+                new_ingredient_name = st.text_input("Ingredient Name")
+                new_ingredient_unit = st.text_input("Unit", value="pcs")
+                new_ingredient_low_stock = st.number_input("Low-Stock Level", min_value=0.0, value=10.0, step=1.0)
+                ingredient_submit_button = st.form_submit_button(label="Add Ingredient")
+                
+                if ingredient_submit_button and new_ingredient_name:
+                    if add_ingredient(new_ingredient_name, new_ingredient_unit, new_ingredient_low_stock):
+                        st.success(f"Added {new_ingredient_name}!")
+                    else:
+                        st.warning(f"Ingredient {new_ingredient_name} already exists!")
+        
+        # Tab for setting the recipe of a menu item
+        with inventory_tabs[2]:
+            menu_index = get_menu_index()
+            if not ingredient_names or not menu_index["by_id"]:
+                st.info("Add ingredients and menu items to define recipes.")
+            else:
+                recipe_item_options = {f"{item['name']} ({item_id[:8]})": item_id for item_id, item in menu_index["by_id"].items()}
+                recipe_item_label = st.selectbox("Menu Item", options=list(recipe_item_options.keys()), key="recipe_item")
+                recipe_item_id = recipe_item_options[recipe_item_label]
+                current_recipe = st.session_state.recipes.get(recipe_item_id, {})
+                
+                with st.form(key="recipe_form"):
+                    recipe_quantities = {}
+                    for ingredient in st.session_state.ingredients:
+                        recipe_quantities[ingredient["name"]] = st.number_input(
+                            f"{ingredient['name']} ({ingredient['unit']})",
+                            min_value=0.0,
+                            value=float(current_recipe.get(ingredient["name"], 0)),
+                            step=0.5,
+                            key=f"recipe_{recipe_item_id}_{ingredient['name']}"
+                        )
+                    recipe_submit_button = st.form_submit_button(label="Save Recipe")
+                    
+                    if recipe_submit_button:
+                        set_recipe(recipe_item_id, recipe_quantities)
+                        st.success(f"Saved recipe for {menu_index['by_id'][recipe_item_id]['name']}!")
+    
+    with col2:
+        st.subheader("Stock Levels")
+        
+        if st.session_state.ingredients:
+            stock_levels = get_stock_levels()
+            stock_df = pd.DataFrame([
+                {
+                    "Ingredient": ingredient["name"],
+                    "Stock": stock_levels.get(ingredient["name"], 0),
+                    "Unit": ingredient["unit"],
+                    "Low-Stock Level": ingredient["low_stock_level"],
+                    "Status": "Low" if stock_levels.get(ingredient["name"], 0) <= ingredient["low_stock_level"] else "OK"
+                }
+                for ingredient in st.session_state.ingredients
+            ])
+            st.dataframe(stock_df.sort_values(by=["Status", "Ingredient"]), hide_index=True, use_container_width=True)
+            
+            # Record usage for orders taken before their recipes were set up
+            st.button("Backfill Usage from Past Orders", key="backfill_usage", on_click=backfill_inventory_usage,
+                      help="Record ingredient usage for past orders that have none yet")
+            if 'backfilled_orders' in st.session_state:
+                st.success(f"Recorded ingredient usage for {st.session_state.pop('backfilled_orders')} past order(s).")
+            
+            # Display recent stock movements
+            if st.session_state.inventory_ledger:
+                st.subheader("Recent Stock Movements")
+                ledger_df = pd.DataFrame([
+                    {
+                        "Date": entry["date"],
+                        "Type": entry["type"],
+                        "Changes": ", ".join(f"{ingredient} {change:+g}" for ingredient, change in entry["changes"].items()),
+                        "Note": entry.get("note", entry.get("order_id", "")[:8])
+                    }
+                    for entry in st.session_state.inventory_ledger[-50:]
+                ])
+                st.dataframe(ledger_df.sort_values(by="Date", ascending=False), hide_index=True, use_container_width=True)
+        else:
+            st.info("No ingredients yet. Add some to start tracking stock.")
+
 # Run the app
 if __name__ == "__main__":
     # Remove the incomplete sidebar statement
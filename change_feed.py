@@ -0,0 +1,293 @@
+# change_feed.py - Append-only change feed with sequence numbers for syncing shop data between nodes
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FEED_FILE = 'shop_changes.jsonl'
+DATA_FILE = 'shop_data.json'
+SYNC_STATE_FILE = 'sync_state.json'
+
+# Streamlit sessions are threads of one process and share this lock; other processes are kept out by
+# an OS-level lock on a sidecar file (see _locked_feed)
+_feed_lock = threading.Lock()
+
+# Last sequence number per feed, together with the feed size it was read at
+_last_sequences = {}
+
+# Changes are written with "seq" as their first key, so it can be read without parsing the whole line
+_SEQ_PATTERN = re.compile(rb'"seq":\s*(\d+)')
+
+
+def last_sequence(feed_path=FEED_FILE):
+    """Return the sequence number of the last change in the feed.
+
+    Only the tail of the file is read, and only until the start of the last line is
+    found, so the cost depends neither on the feed length nor on the last line's size.
+
+    Args:
+        feed_path: Path of the change feed file
+
+    Returns:
+        The last sequence number, or 0 if the feed is empty or missing
+    """
+    if not os.path.exists(feed_path):
+        return 0
+    with open(feed_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return 0
+        # Ignore the newline that terminates the last line
+        f.seek(end - 1)
+        position = end - 1 if f.read(1) == b'\n' else end
+        line_start = 0
+        while position > 0:
+            block_size = min(4096, position)
+            position -= block_size
+            f.seek(position)
+            newline = f.read(block_size).rfind(b'\n')
+            if newline >= 0:
+                line_start = position + newline + 1
+                break
+        f.seek(line_start)
+        match = _SEQ_PATTERN.search(f.read(64))
+    return int(match.group(1)) if match else 0
+
+
+@contextlib.contextmanager
+def _locked_feed(feed_path):
+    """Hold an exclusive OS-level lock on the feed for as long as the block runs.
+
+    The lock is taken on a separate ".lock" file, so readers of the feed itself are never blocked.
+    """
+    with open(feed_path + '.lock', 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_change(op, payload, feed_path=FEED_FILE):
+    """Record a mutation in the change feed under the next sequence number.
+
+    Args:
+        op: Name of the mutation, e.g. "add_order"
+        payload: JSON-serialisable data needed to replay the mutation
+        feed_path: Path of the change feed file
+
+    Returns:
+        The change that was written, including its sequence number
+    """
+    with _feed_lock, _locked_feed(feed_path):
+        # Reuse the sequence number from our last append unless another process has written since
+        size = os.path.getsize(feed_path) if os.path.exists(feed_path) else 0
+        cached = _last_sequences.get(feed_path)
+        last_seq = cached[1] if cached and cached[0] == size else last_sequence(feed_path)
+        change = {
+            "seq": last_seq + 1,
+            "op": op,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "data": payload
+        }
+        with open(feed_path, 'a') as f:
+            f.write(json.dumps(change) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            _last_sequences[feed_path] = (f.tell(), change["seq"])
+    return change
+
+
+def read_changes(since_seq, offset=0, feed_path=FEED_FILE):
+    """Read all changes with a sequence number greater than since_seq.
+
+    Args:
+        since_seq: Last sequence number the caller has already applied
+        offset: Byte offset in the feed to start reading from, as returned by a previous call
+        feed_path: Path of the change feed file
+
+    Returns:
+        A tuple (changes, offset) where offset is where the next call should resume
+    """
+    changes = []
+    if not os.path.exists(feed_path):
+        return changes, offset
+    with open(feed_path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            # A partially written last line is picked up on the next pull
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            change = json.loads(line)
+            if change["seq"] > since_seq:
+                changes.append(change)
+    return changes, offset
+
+
+def apply_change(data, change, known_ids=None):
+    """Apply a single change to shop data in place.
+
+    Changes are idempotent, so replaying one that is already reflected in the data is harmless.
+
+    Args:
+        data: Shop data dictionary with orders, menu items, expenses, categories and inventory
+        change: A change as returned by read_changes
+        known_ids: Optional dictionary of id sets per list, kept up to date between calls so
+            replaying many changes does not rescan the lists for every change
+    """
+    if known_ids is None:
+        known_ids = {}
+
+    def ids(key, field="id"):
+        if key not in known_ids:
+            known_ids[key] = {record[field] for record in data[key]}
+        return known_ids[key]
+
+    op = change["op"]
+    payload = change["data"]
+
+    if op == "add_order":
+        if payload["order"]["id"] not in ids("orders"):
+            data["orders"].append(payload["order"])
+            ids("orders").add(payload["order"]["id"])
+    elif op == "delete_order":
+        data["orders"] = [order for order in data["orders"] if order["id"] != payload["id"]]
+        ids("orders").discard(payload["id"])
+    elif op == "add_expense":
+        if payload["expense"]["id"] not in ids("expenses"):
+            data["expenses"].append(payload["expense"])
+            ids("expenses").add(payload["expense"]["id"])
+    elif op == "add_menu_item":
+        if payload["item"]["id"] not in ids("menu_items"):
+            data["menu_items"].append(payload["item"])
+            ids("menu_items").add(payload["item"]["id"])
+    elif op == "delete_menu_item":
+        data["menu_items"] = [item for item in data["menu_items"] if item["id"] != payload["id"]]
+        ids("menu_items").discard(payload["id"])
+        data["recipes"].pop(payload["id"], None)
+    elif op == "add_menu_category":
+        if payload["category"] not in data["menu_categories"]:
+            data["menu_categories"].append(payload["category"])
+    elif op == "set_menu_item_image":
+        for item in data["menu_items"]:
+            if item["id"] == payload["id"]:
+                item["image"] = payload["image"]
+    elif op == "add_ingredient":
+        if payload["ingredient"]["name"] not in ids("ingredients", "name"):
+            data["ingredients"].append(payload["ingredient"])
+            ids("ingredients", "name").add(payload["ingredient"]["name"])
+    elif op == "set_recipe":
+        if payload["recipe"]:
+            data["recipes"][payload["id"]] = payload["recipe"]
+        else:
+            data["recipes"].pop(payload["id"], None)
+    elif op == "add_inventory_entries":
+        recorded = ids("inventory_ledger")
+        for entry in payload["entries"]:
+            if entry["id"] not in recorded:
+                data["inventory_ledger"].append(entry)
+                recorded.add(entry["id"])
+    else:
+        raise ValueError(f"Unknown change operation: {op}")
+
+    data["last_seq"] = change["seq"]
+
+
+def _load_json(path, default):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return default
+
+
+def _save_json(path, data):
+    # Write to a temporary file first so a reader never sees a half-written file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def sync_once(source_dir, target_dir):
+    """Pull new changes from the source node and apply them to the replica.
+
+    On the first run the replica is seeded from the source snapshot and the whole feed
+    is replayed over it, after that only the part of the feed written since the last
+    pull is read.
+
+    Args:
+        source_dir: Directory of the node that owns the data (contains shop_data.json and the feed)
+        target_dir: Directory of the replica
+
+    Returns:
+        The number of changes applied
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    target_data_path = os.path.join(target_dir, DATA_FILE)
+    sync_state_path = os.path.join(target_dir, SYNC_STATE_FILE)
+    feed_path = os.path.join(source_dir, FEED_FILE)
+
+    sync_state = _load_json(sync_state_path, None)
+    if sync_state is None or not os.path.exists(target_data_path):
+        # Seed the replica from a full snapshot and replay the feed from the start, because a
+        # snapshot saved by one session can miss changes that other sessions recorded before it
+        data = _load_json(os.path.join(source_dir, DATA_FILE), {})
+        sync_state = {"seq": 0, "offset": 0}
+    else:
+        data = _load_json(target_data_path, {})
+
+    for key in ("orders", "menu_items", "expenses", "menu_categories", "ingredients", "inventory_ledger"):
+        data.setdefault(key, [])
+    data.setdefault("recipes", {})
+
+    changes, offset = read_changes(sync_state["seq"], sync_state["offset"], feed_path)
+    known_ids = {}
+    for change in changes:
+        apply_change(data, change, known_ids)
+
+    if changes or not os.path.exists(target_data_path):
+        _save_json(target_data_path, data)
+    sync_state = {"seq": data.get("last_seq", sync_state["seq"]), "offset": offset}
+    _save_json(sync_state_path, sync_state)
+    return len(changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a replica of the shop data in sync with the change feed of another node.")
+    parser.add_argument("--source", required=True, help="Directory of the counter node (shop_data.json and shop_changes.jsonl)")
+    parser.add_argument("--target", required=True, help="Directory of the replica")
+    parser.add_argument("--interval", type=float, default=0, help="Seconds between pulls; 0 pulls once and exits")
+    args = parser.parse_args()
+
+    while True:
+        applied = sync_once(args.source, args.target)
+        print(f"Applied {applied} change(s)")
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
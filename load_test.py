@@ -0,0 +1,413 @@
+# load_test.py - Load test for order submission and report rendering with many concurrent sessions on one server
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+from streamlit.testing.v1.element_tree import InitialValue, Widget, get_widget_state, parse_tree_from_messages
+from tornado.websocket import websocket_connect
+
+APP_FILES = ['app.py', 'imghdr.py', 'change_feed.py']
+ORDER_ID_PATTERN = re.compile(r"Order ID: ([0-9a-f]{8})")
+
+
+def prepare_workdir(data_file):
+    """Copy the app and a starting dataset into a scratch directory.
+
+    The app reads and writes its data relative to the working directory, so the
+    load test runs there to leave the real shop data untouched.
+
+    Args:
+        data_file: Path of the shop_data.json to start from, or None for an empty shop
+
+    Returns:
+        Path of the scratch directory
+    """
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="shop_load_test_")
+    for file_name in APP_FILES:
+        shutil.copy(os.path.join(source_dir, file_name), workdir)
+    if data_file:
+        with open(data_file, 'r') as f:
+            data = json.load(f)
+        # Start the feed from scratch so every add_order in it belongs to this run
+        data.pop("last_seq", None)
+        with open(os.path.join(workdir, 'shop_data.json'), 'w') as f:
+            json.dump(data, f)
+    return workdir
+
+
+def build_schedule(duration, order_rate, report_rate):
+    """Build a time-ordered list of (offset_seconds, action) for one session.
+
+    Actions are spaced with exponential gaps so sessions do not fire in lockstep.
+    """
+    schedule = []
+    for action, rate in (("order", order_rate), ("report", report_rate)):
+        if rate <= 0:
+            continue
+        offset = random.expovariate(rate)
+        while offset < duration:
+            schedule.append((offset, action))
+            offset += random.expovariate(rate)
+    return sorted(schedule)
+
+
+def find_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, timeout):
+    """Start one `streamlit run` server for the app in workdir and wait until it is healthy.
+
+    Returns:
+        A tuple (process, port)
+    """
+    port = find_free_port()
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.headless=true", "--server.address=127.0.0.1", f"--server.port={port}",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false"],
+        cwd=workdir, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}, see {log.name}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server, port
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server did not become healthy within {timeout}s, see {log.name}")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+class BrowserSession:
+    """A websocket client that talks to the server the way a browser tab does.
+
+    Every run collects the page the server renders and parses it into the same element
+    tree AppTest uses, so widgets are found and changed with the AppTest query API
+    (radio, button, date_input, success, exception). Like a browser, the client only
+    knows the values it has set itself: it sends those with every rerun, and the server
+    keeps the values of all other widgets in its own session state.
+    The websocket I/O of all sessions runs on one shared event loop thread.
+    """
+
+    def __init__(self, url, loop, timeout):
+        self._tree = None
+        self._loop = loop
+        self._messages_by_hash = {}
+        self._widget_states = {}
+        self.default_timeout = timeout
+        self.last_run_seconds = None
+        self._conn = self._call(self._connect(url))
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _connect(self, url):
+        return await websocket_connect(url)
+
+    async def _rerun(self, widget_states, timeout):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.widget_states.CopyFrom(widget_states)
+        started = time.perf_counter()
+        await self._conn.write_message(msg.SerializeToString(), binary=True)
+        messages = []
+        while True:
+            payload = await asyncio.wait_for(self._conn.read_message(), timeout)
+            if payload is None:
+                raise ConnectionError("Server closed the connection")
+            forward_msg = ForwardMsg()
+            forward_msg.ParseFromString(payload)
+            # Large messages the session has seen before are sent as a reference to their hash
+            if forward_msg.WhichOneof("type") == "ref_hash":
+                cached = ForwardMsg()
+                cached.CopyFrom(self._messages_by_hash[forward_msg.ref_hash])
+                cached.metadata.CopyFrom(forward_msg.metadata)
+                forward_msg = cached
+            elif forward_msg.metadata.cacheable:
+                self._messages_by_hash[forward_msg.hash] = forward_msg
+            msg_type = forward_msg.WhichOneof("type")
+            if msg_type == "new_session":
+                # A rerun requested by the script itself starts over with a fresh page
+                messages = []
+            elif msg_type == "script_finished":
+                if forward_msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.last_run_seconds = time.perf_counter() - started
+                    return messages
+            else:
+                messages.append(forward_msg)
+
+    def _changed_widget_states(self):
+        """Widget states to send: values set on earlier pages plus the widgets changed on this one."""
+        triggers = []
+        if self._tree is not None:
+            for node in self._tree:
+                if not isinstance(node, Widget) or node._value is None or isinstance(node._value, InitialValue):
+                    continue
+                state = get_widget_state(node)
+                # Button clicks fire once, other values stick like they do in the browser
+                if state.WhichOneof("value") == "trigger_value":
+                    triggers.append(state)
+                else:
+                    self._widget_states[state.id] = state
+        widget_states = WidgetStates()
+        widget_states.widgets.extend(list(self._widget_states.values()) + triggers)
+        return widget_states
+
+    def run(self, *, timeout=None):
+        messages = self._call(self._rerun(self._changed_widget_states(), timeout or self.default_timeout))
+        self._tree = parse_tree_from_messages(messages)
+        # Widget interactions (click().run(), set_value().run()) rerun through this client
+        self._tree.run = self.run
+        return self
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._conn.close)
+
+    def __getattr__(self, name):
+        if self._tree is None:
+            raise AttributeError(name)
+        return getattr(self._tree, name)
+
+
+class Session:
+    """One simulated cashier with its own browser session on the shared server."""
+
+    def __init__(self, url, loop, timeout, seed):
+        self.app = BrowserSession(url, loop, timeout)
+        self.random = random.Random(seed)
+        self.order_latencies = []
+        self.render_latencies = []
+        self.submitted_ids = []
+        self.errors = []
+        self.report_toggle = False
+
+    def start(self):
+        self.app.run()
+        self.app.radio(key="order_mode").set_value("Quick").run()
+        # Open the first category that has items so there is something to order
+        for category in self.app.radio(key="order_category").options:
+            self.app.radio(key="order_category").set_value(category).run()
+            if self._item_keys():
+                return True
+        return False
+
+    def _item_keys(self):
+        return [button.key for button in self.app.button if button.key and button.key.startswith("add_")]
+
+    def submit_order(self):
+        for key in self.random.sample(self._item_keys(), k=min(2, len(self._item_keys()))):
+            self.app.button(key=key).click().run()
+        self.app.button(key="complete_quick_order").click().run()
+        self.order_latencies.append(self.app.last_run_seconds)
+        self._check_exception()
+        for success in self.app.success:
+            match = ORDER_ID_PATTERN.search(success.value)
+            if match:
+                self.submitted_ids.append(match.group(1))
+
+    def open_reports(self):
+        # Changing the report date ranges reruns the app and redraws the Sales Report and Dashboard
+        self.report_toggle = not self.report_toggle
+        shift = timedelta(days=-1 if self.report_toggle else 0)
+        for key in ("sales_start", "dash_start"):
+            date_input = self.app.date_input(key=key)
+            # The server renders the default date; the value in use is only known to this client
+            default = datetime.strptime(date_input.proto.default[0], "%Y/%m/%d").date()
+            date_input.set_value(default + shift)
+        self.app.run()
+        self.render_latencies.append(self.app.last_run_seconds)
+        self._check_exception()
+
+    def _check_exception(self):
+        for exception in self.app.exception:
+            self.errors.append(exception.message)
+
+    def run(self, schedule):
+        try:
+            if not self.start():
+                self.errors.append("No menu items to order")
+                return
+            began = time.perf_counter()
+            for offset, action in schedule:
+                delay = began + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if action == "order":
+                    self.submit_order()
+                else:
+                    self.open_reports()
+        except Exception as e:
+            self.errors.append(repr(e))
+        finally:
+            self.app.close()
+
+
+def run_session(url, loop, schedule, timeout, seed):
+    """Run one session in a worker thread and return its measurements."""
+    try:
+        session = Session(url, loop, timeout, seed)
+    except Exception as e:
+        return {"order_latencies": [], "render_latencies": [], "submitted_ids": [], "errors": [repr(e)]}
+    session.run(schedule)
+    return {
+        "order_latencies": session.order_latencies,
+        "render_latencies": session.render_latencies,
+        "submitted_ids": session.submitted_ids,
+        "errors": session.errors
+    }
+
+
+def check_orders(sessions):
+    """Compare submitted orders against the change feed and the saved data.
+
+    Returns:
+        A tuple (lost, duplicated) order counts
+    """
+    submitted = [order_id for session in sessions for order_id in session["submitted_ids"]]
+
+    recorded = set()
+    if os.path.exists('shop_changes.jsonl'):
+        with open('shop_changes.jsonl', 'r') as f:
+            for line in f:
+                change = json.loads(line)
+                if change["op"] == "add_order":
+                    recorded.add(change["data"]["order"]["id"][:8])
+
+    saved_ids = []
+    if os.path.exists('shop_data.json'):
+        with open('shop_data.json', 'r') as f:
+            saved_ids = [order["id"][:8] for order in json.load(f)["orders"]]
+    saved_counts = {}
+    for order_id in saved_ids:
+        saved_counts[order_id] = saved_counts.get(order_id, 0) + 1
+
+    # An order is lost if it was confirmed to the cashier but is missing from the feed or the saved data
+    lost = sum(1 for order_id in set(submitted) | recorded if order_id not in recorded or order_id not in saved_counts)
+    duplicated = sum(count - 1 for count in saved_counts.values() if count > 1)
+    duplicated += len(submitted) - len(set(submitted))
+    return lost, duplicated
+
+
+def percentiles(latencies):
+    if not latencies:
+        return [float("nan")] * 3
+    return list(np.percentile(np.array(latencies) * 1000, [50, 95, 99]))
+
+
+def run_level(concurrency, args):
+    workdir = prepare_workdir(args.data)
+    previous_dir = os.getcwd()
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    try:
+        # All sessions connect to one server, so they share its process-wide caches like real cashiers do
+        server, port = start_server(workdir, args.timeout)
+        try:
+            url = f"ws://127.0.0.1:{port}/_stcore/stream"
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(
+                        run_session,
+                        url,
+                        loop,
+                        build_schedule(args.duration, args.order_rate, args.report_rate),
+                        args.timeout,
+                        random.random()
+                    )
+                    for _ in range(concurrency)
+                ]
+                sessions = [future.result() for future in futures]
+        finally:
+            stop_server(server)
+        os.chdir(workdir)
+        lost, duplicated = check_orders(sessions)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+        os.chdir(previous_dir)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"    kept {workdir}")
+
+    order_latencies = [latency for session in sessions for latency in session["order_latencies"]]
+    render_latencies = [latency for session in sessions for latency in session["render_latencies"]]
+    return {
+        "sessions": concurrency,
+        "orders": len(order_latencies),
+        "order_ms": percentiles(order_latencies),
+        "renders": len(render_latencies),
+        "render_ms": percentiles(render_latencies),
+        "lost": lost,
+        "duplicated": duplicated,
+        "errors": [error for session in sessions for error in session["errors"]]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive one app server with many concurrent browser sessions and report latency percentiles.")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated concurrency levels to test")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds each session keeps submitting per level")
+    parser.add_argument("--order-rate", type=float, default=0.5, help="Orders per second per session")
+    parser.add_argument("--report-rate", type=float, default=0.2, help="Report tab opens per second per session")
+    parser.add_argument("--data", default="shop_data.json", help="Dataset to start from (copied, never modified)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout in seconds for server start-up and for a single app run")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable schedules")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directories for inspection")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.data and not os.path.exists(args.data):
+        args.data = None
+
+    print(f"{'sessions':>8} {'orders':>6} {'order p50/p95/p99 ms':>24} {'renders':>7} {'render p50/p95/p99 ms':>24} {'lost':>5} {'dup':>4}")
+    for concurrency in [int(level) for level in args.sessions.split(",")]:
+        result = run_level(concurrency, args)
+        order_ms = "/".join(f"{value:.0f}" for value in result["order_ms"])
+        render_ms = "/".join(f"{value:.0f}" for value in result["render_ms"])
+        print(f"{result['sessions']:>8} {result['orders']:>6} {order_ms:>24} {result['renders']:>7} {render_ms:>24} {result['lost']:>5} {result['duplicated']:>4}")
+        for error in sorted(set(result["errors"])):
+            print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    main()
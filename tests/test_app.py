@@ -0,0 +1,242 @@
+import io
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILES = ["app.py", "imghdr.py", "change_feed.py"]
+
+
+@pytest.fixture
+def shop_dir(tmp_path, monkeypatch):
+    """Scratch copy of the app, since it reads and writes its data in the working directory."""
+    for file_name in APP_FILES:
+        shutil.copy(os.path.join(REPO_DIR, file_name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return tmp_path
+
+
+def write_shop_data(shop_dir, **data):
+    data.setdefault("orders", [])
+    data.setdefault("expenses", [])
+    data.setdefault("menu_categories", ["Fast Food", "Snacks", "Beverages", "Desserts", "Others"])
+    with open(shop_dir / "shop_data.json", "w") as f:
+        json.dump(data, f)
+
+
+def run_app(shop_dir):
+    return AppTest.from_file(str(shop_dir / "app.py"), default_timeout=60).run()
+
+
+def open_quick_category(at, category):
+    at.radio(key="order_mode").set_value("Quick").run()
+    at.radio(key="order_category").set_value(category).run()
+    return at
+
+
+def test_broken_and_cmyk_images_do_not_break_the_order_grid(shop_dir):
+    os.makedirs(shop_dir / "data" / "images")
+    # Passes the magic byte check but does not decode
+    with open(shop_dir / "data" / "images" / "broken.jpeg", "wb") as f:
+        f.write(b"\xff\xd8" + b"\x00" * 64)
+    buffer = io.BytesIO()
+    Image.new("CMYK", (400, 300)).save(buffer, "JPEG")
+    with open(shop_dir / "data" / "images" / "cmyk.jpeg", "wb") as f:
+        f.write(buffer.getvalue())
+    write_shop_data(shop_dir, menu_items=[
+        {"id": "a", "name": "Dabeli", "price": 20, "category": "Fast Food", "image": "broken.jpeg"},
+        {"id": "b", "name": "Vada Pav", "price": 15, "category": "Fast Food", "image": "cmyk.jpeg"}
+    ])
+
+    at = open_quick_category(run_app(shop_dir), "Fast Food")
+
+    assert not at.exception
+    assert len(at.get("imgs")) == 1
+
+
+def test_first_order_in_an_empty_shop_is_saved(shop_dir):
+    at = open_quick_category(run_app(shop_dir), "Fast Food")
+    # The dashboard has built the empty daily series by now, so the order updates it in place
+    at.button(key=[button.key for button in at.button if button.key and button.key.startswith("add_")][0]).click().run()
+    at.button(key="complete_quick_order").click().run()
+
+    assert not at.exception
+    with open(shop_dir / "shop_data.json") as f:
+        orders = json.load(f)["orders"]
+    assert len(orders) == 1
+    with open(shop_dir / "shop_changes.jsonl") as f:
+        changes = [json.loads(line) for line in f]
+    assert [change["data"]["order"]["id"] for change in changes if change["op"] == "add_order"] == [orders[0]["id"]]
+
+    # The next run reads the updated series back for the dashboard
+    at.run()
+    assert not at.exception
+
+
+def test_failing_warm_up_is_logged_once_and_not_retried(shop_dir, caplog):
+    # An order without a date breaks the date index the warm-up builds
+    write_shop_data(shop_dir, orders=[{"id": "bad", "items": [], "total": 0}])
+
+    at = run_app(shop_dir)
+    deadline = time.monotonic() + 10
+    while not caplog.records and time.monotonic() < deadline:
+        time.sleep(0.05)
+    at.run()
+    at.run()
+    time.sleep(0.5)
+
+    failures = [record for record in caplog.records if "Building derived state" in record.getMessage()]
+    assert len(failures) == 1
+
+
+def test_prepared_report_is_served_without_rereading_the_file(shop_dir):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    write_shop_data(shop_dir, orders=[
+        {"id": "report-order", "date": now, "items": [{"id": "a", "name": "Dabeli", "price": 20, "quantity": 2, "subtotal": 40}], "total": 40}
+    ])
+
+    at = run_app(shop_dir)
+    at.button(key="prepare_sales_csv").click().run()
+    assert not at.exception
+    reports = [name for name in os.listdir(shop_dir / "data" / "reports") if name.startswith("sales_")]
+    assert len(reports) == 1
+    report_path = shop_dir / "data" / "reports" / reports[0]
+    # The first rerun reads the report and marks it as used
+    at.run()
+    os.utime(report_path, (0, 0))
+
+    at.run()
+    at.run()
+
+    # Reruns neither touch the cached file nor need it on disk once it has been read
+    assert os.stat(report_path).st_mtime == 0
+    os.remove(report_path)
+    at.run()
+    assert not at.exception
+    assert "prepare_sales_csv" not in [button.key for button in at.button]
+
+
+def read_saved_data(shop_dir):
+    with open(shop_dir / "shop_data.json") as f:
+        return json.load(f)
+
+
+def test_backfill_and_delete_order_keep_stock_in_step(shop_dir):
+    def order(order_id, *lines):
+        items = [{"id": item_id, "name": item_id, "price": 10, "quantity": quantity, "subtotal": 10 * quantity} for item_id, quantity in lines]
+        return {"id": order_id, "date": f"2025-04-23 10:0{order_id[-1]}:00", "items": items, "total": sum(item["subtotal"] for item in items)}
+
+    write_shop_data(
+        shop_dir,
+        menu_items=[
+            {"id": "dabeli", "name": "Dabeli", "price": 10, "category": "Fast Food"},
+            {"id": "tea", "name": "Tea", "price": 10, "category": "Beverages"}
+        ],
+        ingredients=[{"name": name, "unit": "pcs", "low_stock_level": 0} for name in ("Bun", "Potato", "Cup")],
+        recipes={"dabeli": {"Bun": 1, "Potato": 2}},
+        orders=[
+            order("o1", ("dabeli", 2), ("tea", 1)),
+            # Only items without a recipe
+            order("o2", ("tea", 3)),
+            order("o3"),
+            # The same item on two lines
+            order("o4", ("dabeli", 1), ("dabeli", 3))
+        ]
+    )
+
+    at = run_app(shop_dir)
+    at.button(key="backfill_usage").click().run()
+    assert not at.exception
+
+    ledger = read_saved_data(shop_dir)["inventory_ledger"]
+    assert {entry["order_id"]: entry["changes"] for entry in ledger} == {
+        "o1": {"Bun": -2.0, "Potato": -4.0},
+        "o4": {"Bun": -4.0, "Potato": -8.0}
+    }
+    assert all(entry["type"] == "usage" for entry in ledger)
+    assert at.session_state.stock_levels == {"Bun": -6.0, "Potato": -12.0, "Cup": 0}
+
+    # Orders that already have usage are not backfilled twice
+    at.button(key="backfill_usage").click().run()
+    assert len(read_saved_data(shop_dir)["inventory_ledger"]) == 2
+
+    at.button(key="del_order_o1").click().run()
+    at.button(key="del_order_o2").click().run()
+    assert not at.exception
+
+    returns = [entry for entry in read_saved_data(shop_dir)["inventory_ledger"] if entry["type"] == "return"]
+    assert [(entry["order_id"], entry["changes"]) for entry in returns] == [("o1", {"Bun": 2.0, "Potato": 4.0})]
+    assert at.session_state.stock_levels == {"Bun": -4.0, "Potato": -8.0, "Cup": 0}
+
+
+SEARCH_MENU = [
+    {"id": "vada-pav", "name": "Vada Pav", "price": 15, "category": "Fast Food"},
+    {"id": "dabeli", "name": "Dabeli", "price": 20, "category": "Fast Food"},
+    {"id": "pav-bhaji", "name": "Pav Bhaji", "price": 60, "category": "Fast Food"},
+    {"id": "paratha", "name": "Aloo Paratha", "price": 40, "category": "Fast Food", "shortcut": "PA"}
+]
+
+
+def shown_item_ids(at):
+    return [button.key[len("add_"):] for button in at.button if button.key and button.key.startswith("add_")]
+
+
+def test_search_lists_shortcut_then_prefix_then_substring_matches(shop_dir):
+    write_shop_data(shop_dir, menu_items=SEARCH_MENU)
+    at = run_app(shop_dir)
+    at.radio(key="order_mode").set_value("Quick").run()
+
+    at.text_input(key="order_search").input("pa").run()
+    assert shown_item_ids(at) == ["paratha", "pav-bhaji", "vada-pav"]
+
+    # Shortcuts are matched case-insensitively, names without a shortcut use their initials
+    at.text_input(key="order_search").input("vp").run()
+    assert shown_item_ids(at) == ["vada-pav"]
+
+
+def test_cart_caps_quantities_removes_empty_lines_and_skips_deleted_items(shop_dir):
+    write_shop_data(shop_dir, menu_items=SEARCH_MENU)
+    at = open_quick_category(run_app(shop_dir), "Fast Food")
+
+    at.session_state["cart"] = {"dabeli": 100, "vada-pav": 1, "deleted-item": 2}
+    at.button(key="add_dabeli").click().run()
+    assert at.session_state.cart["dabeli"] == 100
+
+    at.button(key="dec_vada-pav").click().run()
+    assert "vada-pav" not in at.session_state.cart
+
+    at.button(key="complete_quick_order").click().run()
+    assert not at.exception
+    with open(shop_dir / "shop_data.json") as f:
+        saved_order = json.load(f)["orders"][0]
+    assert [(item["id"], item["quantity"]) for item in saved_order["items"]] == [("dabeli", 100)]
+    assert saved_order["total"] == 2000
+
+
+def test_sessions_reload_the_data_file_only_when_it_changed(shop_dir):
+    write_shop_data(shop_dir, menu_items=SEARCH_MENU)
+    at = run_app(shop_dir)
+    assert len(at.session_state.menu_items) == 4
+
+    # Rewritten content with the old mtime is taken as unchanged and not read again
+    stat = os.stat(shop_dir / "shop_data.json")
+    write_shop_data(shop_dir, menu_items=SEARCH_MENU[:1])
+    os.utime(shop_dir / "shop_data.json", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    at.run()
+    assert len(at.session_state.menu_items) == 4
+
+    # A write from elsewhere is picked up on the next rerun
+    os.utime(shop_dir / "shop_data.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    at.run()
+    assert not at.exception
+    assert [item["id"] for item in at.session_state.menu_items] == ["vada-pav"]
+    assert shown_item_ids(open_quick_category(at, "Fast Food")) == ["vada-pav"]
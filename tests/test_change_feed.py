@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import change_feed
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITER = textwrap.dedent("""
+    import json, sys
+    import change_feed
+
+    orders = json.loads(sys.argv[1])
+    for order in orders:
+        change_feed.append_change("add_order", {"order": order})
+""")
+
+
+def order(order_id):
+    return {"id": order_id, "date": "2025-04-23 10:00:00", "items": [], "total": 0}
+
+
+def write_orders(node_dir, orders):
+    """Record orders in the node's feed from a separate process, like the counter app does."""
+    subprocess.run(
+        [sys.executable, "-c", WRITER, json.dumps(orders)],
+        cwd=node_dir, env={**os.environ, "PYTHONPATH": REPO_DIR}, check=True
+    )
+
+
+def sync(source_dir, target_dir):
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, "change_feed.py"), "--source", str(source_dir), "--target", str(target_dir)],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def load_orders(node_dir):
+    with open(os.path.join(node_dir, "shop_data.json")) as f:
+        return [saved["id"] for saved in json.load(f)["orders"]]
+
+
+def test_replica_syncs_incrementally_between_two_directories(tmp_path):
+    counter_dir = tmp_path / "counter"
+    replica_dir = tmp_path / "replica"
+    counter_dir.mkdir()
+
+    write_orders(counter_dir, [order("a"), order("b"), order("c")])
+    # A session saved a snapshot that claims seq 3 but lost order "b" to another session's write
+    with open(counter_dir / "shop_data.json", "w") as f:
+        json.dump({"orders": [order("a"), order("c")], "menu_items": [], "expenses": [], "menu_categories": [], "last_seq": 3}, f)
+
+    assert sync(counter_dir, replica_dir) == "Applied 3 change(s)"
+    assert sorted(load_orders(replica_dir)) == ["a", "b", "c"]
+
+    write_orders(counter_dir, [order("d"), order("e")])
+    assert sync(counter_dir, replica_dir) == "Applied 2 change(s)"
+    assert sync(counter_dir, replica_dir) == "Applied 0 change(s)"
+    assert sorted(load_orders(replica_dir)) == ["a", "b", "c", "d", "e"]
+
+
+def test_last_sequence_reads_only_the_start_of_a_long_last_line(tmp_path):
+    feed_path = str(tmp_path / "feed.jsonl")
+    change_feed.append_change("add_order", {"order": order("a")}, feed_path)
+    entries = [{"id": str(i), "changes": {"Bun": -1.0}} for i in range(50000)]
+    change_feed.append_change("add_inventory_entries", {"entries": entries}, feed_path)
+    # Another process appending invalidates the cached sequence number
+    with open(feed_path, "a") as f:
+        f.write(json.dumps({"seq": 7, "op": "add_order", "data": {"order": order("b")}}) + "\n")
+
+    assert change_feed.last_sequence(feed_path) == 7
+    assert change_feed.append_change("add_order", {"order": order("c")}, feed_path)["seq"] == 8
+
+
+CONCURRENT_WRITER = textwrap.dedent("""
+    import sys, time
+    import change_feed
+
+    writer, count, start_at = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+    # Start together with the other writers so their appends interleave
+    time.sleep(max(0, start_at - time.time()))
+    for i in range(count):
+        change_feed.append_change("add_order", {"order": {"id": f"{writer}-{i}", "date": "2025-04-23 10:00:00", "items": [], "total": 0}})
+""")
+
+
+def test_concurrent_writer_processes_get_unique_increasing_sequence_numbers(tmp_path):
+    start_at = time.time() + 1
+    writers = [
+        subprocess.Popen(
+            [sys.executable, "-c", CONCURRENT_WRITER, str(writer), "300", str(start_at)],
+            cwd=tmp_path, env={**os.environ, "PYTHONPATH": REPO_DIR}
+        )
+        for writer in range(3)
+    ]
+    for writer in writers:
+        assert writer.wait(timeout=120) == 0
+
+    with open(tmp_path / "shop_changes.jsonl") as f:
+        seqs = [json.loads(line)["seq"] for line in f]
+    assert seqs == list(range(1, 901))